@@ -1,4 +1,5 @@
 import os
+import sys
 import asyncio
 import uuid
 from datetime import datetime
@@ -7,6 +8,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
@@ -22,6 +24,11 @@ from typing import List, Dict, Any
 from bs4 import BeautifulSoup
 import logging
 
+# vector_index.py lives at the repository root, shared with bill-summarizer.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import MemmapVectorIndex
+from batch_rag import retrieve_batch, rerank_batch_hf
+
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -110,12 +117,19 @@ async def lifespan(app: FastAPI):
     """Initialize and cleanup the RAG system"""
     global vector_store
     
-    # Initialize Chroma vector store on startup
+    # Initialize the vector store on startup; VECTOR_BACKEND=memmap selects the
+    # in-process index built with `python vector_index.py build`
     try:
-        vector_store = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=ollama_emb
-        )
+        if os.environ.get("VECTOR_BACKEND", "chroma") == "memmap":
+            vector_store = MemmapVectorIndex(
+                os.environ.get("VECTOR_INDEX_DIR", "./vector_index"),
+                ollama_emb
+            )
+        else:
+            vector_store = Chroma(
+                persist_directory="./chroma_db",
+                embedding_function=ollama_emb
+            )
         print("✅ Vector store initialized successfully")
     except Exception as e:
         print(f"❌ Failed to initialize vector store: {e}")
@@ -181,6 +195,19 @@ class ChatResponse(BaseModel):
     sources: Optional[List[DocumentSource]] = None
     metadata: Optional[Dict[str, Any]] = None
 
+class BatchChatRequest(BaseModel):
+    questions: List[str]
+    billIds: Optional[List[str]] = None
+    sessionId: str
+    maxConcurrency: int = 4
+
+class BatchChatResult(BaseModel):
+    question: str
+    billId: Optional[str] = None
+    content: Optional[str] = None
+    sources: Optional[List[DocumentSource]] = None
+    error: Optional[str] = None
+
 class SearchFilters(BaseModel):
     chamber: Optional[str] = None
     status: Optional[str] = None
@@ -240,6 +267,34 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def build_answer_prompt(question: str, docs: List[Document]) -> str:
+    """LLM prompt answering a question from the retrieved documents"""
+    context = "\n\n".join([doc.page_content for doc in docs])
+    
+    return f"""You are a helpful assistant specialized in US Congressional legislation. 
+        Based on the following context from bills and documents, answer the user's question accurately and concisely.
+        
+        Context:
+        {context}
+        
+        User Question: {question}
+        
+        Provide a clear, informative answer. If the context doesn't contain relevant information, say so and provide general guidance."""
+
+def build_sources(docs: List[Document]) -> List[DocumentSource]:
+    """Create mock sources from retrieved documents"""
+    sources = []
+    for i, doc in enumerate(docs):
+        sources.append(DocumentSource(
+            id=f"src-{uuid.uuid4()}",
+            billId=doc.metadata.get('source', 'unknown'),
+            title=f"Document {i+1}: {doc.metadata.get('source', 'Unknown Source')}",
+            excerpt=doc.page_content[:200] + "...",
+            relevanceScore=0.9 - (i * 0.1),
+            url=f"/documents/{doc.metadata.get('chunk_id', i)}"
+        ))
+    return sources
+
 # API Routes
 @app.get("/")
 async def root():
@@ -329,35 +384,10 @@ async def send_chat_message(request: ChatRequest):
             except Exception as e:
                 print(f"Re-ranking failed, using original docs: {e}")
         
-        # Prepare context from retrieved documents
-        context = "\n\n".join([doc.page_content for doc in docs[:3]])
-        
-        # Generate response using the LLM
-        prompt = f"""You are a helpful assistant specialized in US Congressional legislation. 
-        Based on the following context from bills and documents, answer the user's question accurately and concisely.
-        
-        Context:
-        {context}
-        
-        User Question: {request.message}
-        
-        Provide a clear, informative answer. If the context doesn't contain relevant information, say so and provide general guidance."""
-        
         response = await asyncio.get_event_loop().run_in_executor(
-            None, chat.invoke, prompt
+            None, chat.invoke, build_answer_prompt(request.message, docs[:3])
         )
-        
-        # Create mock sources from retrieved documents
-        sources = []
-        for i, doc in enumerate(docs[:3]):
-            sources.append(DocumentSource(
-                id=f"src-{uuid.uuid4()}",
-                billId=doc.metadata.get('source', 'unknown'),
-                title=f"Document {i+1}: {doc.metadata.get('source', 'Unknown Source')}",
-                excerpt=doc.page_content[:200] + "...",
-                relevanceScore=0.9 - (i * 0.1),
-                url=f"/documents/{doc.metadata.get('chunk_id', i)}"
-            ))
+        sources = build_sources(docs[:3])
         
         return ChatResponse(
             messageId=str(uuid.uuid4()),
@@ -375,6 +405,70 @@ async def send_chat_message(request: ChatRequest):
         print(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process message: {str(e)}")
 
+@app.post("/api/v1/chat/batch")
+async def send_chat_batch(request: BatchChatRequest):
+    """Answer every question against every bill, streaming JSONL results as they complete"""
+    if not vector_store:
+        raise HTTPException(status_code=503, detail="RAG system not available")
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    
+    loop = asyncio.get_event_loop()
+    try:
+        # One embedding call for all questions, then one re-ranking pass over every candidate
+        items = await loop.run_in_executor(
+            None, retrieve_batch, vector_store, ollama_emb, request.questions, request.billIds, 10
+        )
+    except Exception as e:
+        print(f"Batch retrieval error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve context: {str(e)}")
+    
+    try:
+        items = await loop.run_in_executor(
+            None, rerank_batch_hf, items, "BAAI/bge-reranker-large", 3
+        )
+    except Exception as e:
+        print(f"Re-ranking failed, using original docs: {e}")
+        for item in items:
+            item["documents"] = item["documents"][:3]
+    
+    semaphore = asyncio.Semaphore(max(1, request.maxConcurrency))
+    
+    async def answer(item: Dict[str, Any]) -> BatchChatResult:
+        if not item["documents"]:
+            return BatchChatResult(
+                question=item["question"],
+                billId=item["billId"],
+                error=f"No documents found for bill {item['billId']}" if item["billId"] else "No documents found"
+            )
+        async with semaphore:
+            try:
+                response = await loop.run_in_executor(
+                    None, chat.invoke, build_answer_prompt(item["question"], item["documents"])
+                )
+                return BatchChatResult(
+                    question=item["question"],
+                    billId=item["billId"],
+                    content=response.content,
+                    sources=build_sources(item["documents"])
+                )
+            except Exception as e:
+                print(f"Batch chat error: {e}")
+                return BatchChatResult(question=item["question"], billId=item["billId"], error=str(e))
+    
+    async def stream_results():
+        tasks = [asyncio.create_task(answer(item)) for item in items]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                yield result.model_dump_json() + "\n"
+        finally:
+            # Stop pending generations if the client disconnects
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time chat"""
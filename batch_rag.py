@@ -0,0 +1,108 @@
+import logging
+from typing import List, Dict, Any, Optional
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from langchain_core.documents import Document
+
+_rerankers: Dict[str, Any] = {}
+
+
+def load_reranker(model_name: str = "BAAI/bge-reranker-large"):
+    """Load a re-ranker once per process and reuse it across batches"""
+    if model_name not in _rerankers:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model.to(device)
+        model.eval()
+        _rerankers[model_name] = (tokenizer, model, device)
+    return _rerankers[model_name]
+
+
+def retrieve_batch(
+    db,
+    embeddings_model,
+    questions: List[str],
+    bill_ids: Optional[List[str]] = None,
+    k: int = 10,
+) -> List[Dict[str, Any]]:
+    """Retrieve candidates for every (question, bill) pair.
+
+    All questions are embedded in a single call. Stores that expose
+    `similarity_search_by_vectors` (the memmap index) answer every question
+    for a bill with one matrix search; Chroma is queried per question with
+    the precomputed embedding. A bill id is the chunk `source`.
+    """
+    if not questions:
+        return []
+
+    query_vectors = embeddings_model.embed_documents(questions)
+
+    items = []
+    for bill_id in bill_ids or [None]:
+        where = {"source": bill_id} if bill_id else None
+        if hasattr(db, "similarity_search_by_vectors"):
+            documents_per_question = db.similarity_search_by_vectors(
+                query_vectors, k=k, filter=where)
+        else:
+            documents_per_question = [
+                db.similarity_search_by_vector(vector, k=k, filter=where)
+                for vector in query_vectors
+            ]
+
+        if bill_id and not any(documents_per_question):
+            logging.warning(
+                f"No chunks found for bill {bill_id!r}; check that it matches a chunk source")
+
+        for question, documents in zip(questions, documents_per_question):
+            items.append(
+                {"question": question, "billId": bill_id, "documents": documents})
+
+    logging.info(
+        f"Retrieved candidates for {len(questions)} questions x {len(bill_ids or [None])} bills")
+    return items
+
+
+def rerank_batch_hf(
+    items: List[Dict[str, Any]],
+    model_name: str = "BAAI/bge-reranker-large",
+    top_k: int = 10,
+    batch_size: int = 32,
+) -> List[Dict[str, Any]]:
+    """Re-rank the `documents` of every item, scoring all query-document pairs in shared batches"""
+    tokenizer, model, device = load_reranker(model_name)
+
+    pairs = []
+    owners = []
+    for item_index, item in enumerate(items):
+        for doc_index, doc in enumerate(item["documents"]):
+            pairs.append([item["question"], doc.page_content])
+            owners.append((item_index, doc_index))
+
+    scores: List[float] = []
+    for start in range(0, len(pairs), batch_size):
+        inputs = tokenizer(pairs[start:start + batch_size], padding=True, truncation=True,
+                           return_tensors="pt").to(device)
+        with torch.no_grad():
+            scores.extend(model(**inputs).logits.view(-1).tolist())
+
+    scored: List[List[tuple]] = [[] for _ in items]
+    for (item_index, doc_index), score in zip(owners, scores):
+        scored[item_index].append(
+            (score, items[item_index]["documents"][doc_index]))
+
+    for item, item_scores in zip(items, scored):
+        item_scores.sort(key=lambda x: x[0], reverse=True)
+        item["documents"] = [doc for _, doc in item_scores[:top_k]]
+        item["scores"] = [score for score, _ in item_scores[:top_k]]
+
+    return items
+
+
+def build_context(documents: List[Document]) -> str:
+    context = ""
+    for i, doc in enumerate(documents):
+        context += f"Result {i}\n{doc.page_content}\n\n"
+    return context
@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+import argparse
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
@@ -8,13 +10,33 @@ import re
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
 import logging
+from vector_index import MemmapVectorIndex
+from batch_rag import retrieve_batch, rerank_batch_hf, build_context
+from section_summaries import summarize_sections
+from xml_chunking import chunk_xml_bill
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+parser = argparse.ArgumentParser(description="Chat with bills, or answer a batch of questions")
+parser.add_argument("--questions",
+                    help="batch mode: text file with one question per line")
+parser.add_argument("--bills", nargs="*", default=None,
+                    help="batch mode: bill ids (chunk sources) to ask every question against")
+parser.add_argument("--output", default=None,
+                    help="batch mode: JSONL output file (defaults to stdout)")
+parser.add_argument("--max-concurrency", type=int, default=4,
+                    help="batch mode: concurrent LLM generations")
+parser.add_argument("--bill", default="./text-docs/bill.txt",
+                    help="document to index when creating a new vector store (.txt or congress.gov .xml)")
+parser.add_argument("--summary-cache", default="./summary_cache.json",
+                    help="cache of XML section summaries, keyed by section content hash")
+args = parser.parse_args()
+
 ollama_emb = OllamaEmbeddings(
     model="mxbai-embed-large",
 )
@@ -93,94 +115,52 @@ def chunk_text_with_semantic(document_path, ollama_embeddings_model):
     return documents
 
 
-def chunk_xml_bill(document_path, ollama_embeddings_model, max_chunk_size=2048):
-    documents = []
+def load_documents(document_path):
+    if not document_path.endswith(".xml"):
+        return chunk_text_with_semantic(document_path, ollama_emb)
+
+    documents = chunk_xml_bill(document_path, ollama_emb, max_chunk_size=2048)
+    # Heading-only containers stand in the index as their summaries, so broad questions
+    # ("summarize Title III") retrieve a few summary nodes instead of dozens of leaves
+    leaves = [doc for doc in documents if not doc.metadata.get("container")]
+    return leaves + summarize_sections(documents, chat, cache_path=args.summary_cache)
 
-    with open(document_path, 'r', encoding='utf-8') as file:
-        xml_content = file.read()
-
-    soup = BeautifulSoup(xml_content, 'lxml-xml')
-    root = soup.find()
-
-    def process_element(element, parent_id=None, skip_children=False):
-        element_id = len(documents)
-
-        # Extract attributes
-        attributes = dict(element.attrs)
-
-        # Log the tag name and ID
-        tag_name = element.name
-        # Get the id attribute, if it exists
-        tag_id = attributes.get('id', 'N/A')
-        logging.info(f"Processing tag: {tag_name}, ID: {tag_id}")
-
-        element_string = str(element)
-        element_length = len(element_string)
-
-        if element_length > max_chunk_size:
-            # If the element is too large, process its children
-            children = list(element.find_all(recursive=False))
-            if children:
-                for child in children:
-                    # Keep the same parent_id
-                    process_element(child, parent_id, skip_children=False)
-            else:
-                # If no children, create a document for the large element
-                doc = Document(
-                    page_content=element_string,
-                    metadata={
-                        "source": document_path,
-                        "chunk_id": element_id,
-                        "tag_name": tag_name,
-                        "attributes": attributes,
-                        "parent_id": parent_id,
-                        "child_ids": [],  # No children in this case
-                    }
-                )
-                documents.append(doc)
-        else:
-            # If the element is within the size limit, create a document
-            children = list(element.find_all(recursive=False))
-            child_ids = [len(documents) + i + 1 for i in range(len(children))]
-
-            doc = Document(
-                page_content=element_string,
-                metadata={
-                    "source": document_path,
-                    "chunk_id": element_id,
-                    "tag_name": tag_name,
-                    "attributes": attributes,
-                    "parent_id": parent_id,
-                    "child_ids": child_ids,
-                }
-            )
-            documents.append(doc)
-
-            # Recursively process children
-            if not skip_children:
-                for child in children:
-                    process_element(child, element_id, skip_children=True)
-
-    if root:
-        process_element(root)
-    else:
-        print(f"Warning: No root element found in {document_path}")
 
+def chroma_metadata(documents):
+    # Chroma only stores scalar metadata; keep XML attributes/child_ids as JSON strings
+    for doc in documents:
+        doc.metadata = {
+            key: value if value is None or isinstance(value, (str, int, float, bool))
+            else json.dumps(value)
+            for key, value in doc.metadata.items()
+        }
     return documents
 
 
 persist_dir = "./chroma_db"  # Your chosen directory name
+index_dir = "./vector_index"
+# "chroma" or "memmap" (in-process index over a memory-mapped embedding matrix)
+vector_backend = os.environ.get("VECTOR_BACKEND", "chroma")
 
 documents = []
+if vector_backend == "memmap":
+    if not MemmapVectorIndex.exists(index_dir):
+        print("Creating new memmap vector index...")
+        documents = load_documents(args.bill)
+        print(len(documents))
+        db = MemmapVectorIndex.from_documents(documents, ollama_emb, index_dir)
+    else:
+        print("Loading existing memmap vector index...")
+        db = MemmapVectorIndex(index_dir, ollama_emb)
+    collection = db.get()
+    documents = collection["documents"]
 # Check if the database exists
-if not os.path.exists(persist_dir):
+elif not os.path.exists(persist_dir):
     print("Creating new Chroma DB...")
-    documents = chunk_text_with_semantic('./text-docs/bill.txt', ollama_emb)
-    # documents = chunk_xml_bill(
-    #     './rag-docs/BILLS-119hr4544ih.xml', ollama_emb, max_chunk_size=2048)
+    documents = load_documents(args.bill)
     print(len(documents))
     db = Chroma.from_documents(
-        documents, ollama_emb, persist_directory=persist_dir)
+        chroma_metadata(documents), ollama_emb, persist_directory=persist_dir)
     # with open("chunked_documents.json", "w", encoding="utf-8") as json_file:
     #     json.dump(documents, json_file, ensure_ascii=False, indent=2)
 
@@ -190,16 +170,60 @@ else:
     collection = db.get()
     documents = collection["documents"]
 
-messages = [
-    (
-        "system",
-        """You are a helpful assistant that answers questions based on the context and query provided.
+system_prompt = (
+    "system",
+    """You are a helpful assistant that answers questions based on the context and query provided.
         The context will be a collection of excerpts taken from a bill document.
         If the knowledge is in the context, answer the question based on the context.
         If the knowledge is not in the context, 
         simnply answer that there is not enough information has been supplied to answer the question""",
-    )
-]
+)
+
+
+def answer_batch_item(item):
+    if not item["documents"]:
+        raise ValueError(f"No documents found for bill {item['billId']}")
+    context = build_context(item["documents"][:3])
+    ai_msg = chat.invoke([system_prompt, ("human", "Context:" + context +
+                                          "\n\n Query:\n" + item["question"])])
+    return {
+        "question": item["question"],
+        "billId": item["billId"],
+        "answer": ai_msg.content,
+        "chunk_ids": [doc.metadata.get("chunk_id") for doc in item["documents"][:3]],
+    }
+
+
+if args.questions:
+    with open(args.questions, 'r', encoding='utf-8') as file:
+        questions = [line.strip() for line in file if line.strip()]
+
+    items = retrieve_batch(db, ollama_emb, questions, args.bills)
+    try:
+        items = rerank_batch_hf(items, top_k=3)
+    except Exception as e:
+        logging.error(f"Re-ranking failed, using original docs: {e}")
+        for item in items:
+            item["documents"] = item["documents"][:3]
+
+    output_context = open(args.output, 'w', encoding='utf-8') if args.output else nullcontext(sys.stdout)
+    # Answers are written as they complete, not in question order
+    with output_context as output, ThreadPoolExecutor(max_workers=args.max_concurrency) as executor:
+        futures = {executor.submit(answer_batch_item, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(
+                    f"Batch question failed: {item['question']} ({item['billId']}): {e}")
+                result = {"question": item["question"],
+                          "billId": item["billId"], "error": str(e)}
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    sys.exit(0)
+
+messages = [system_prompt]
 
 ai_msg = chat.invoke(messages)
 print(ai_msg.content)
@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import logging
+from typing import List, Dict
+
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+SUMMARY_PROMPT = """You are summarizing part of a U.S. Congressional bill for a retrieval index.
+Write a concise, factual summary of "{heading}" covering what it does, who it affects,
+amounts, dates and deadlines. Use only the excerpts below; they are either the text of
+its subsections or summaries of them, in order."""
+
+
+def _plain_text(xml_string: str) -> str:
+    return BeautifulSoup(xml_string, 'lxml-xml').get_text(" ", strip=True)
+
+
+def _load_cache(cache_path: str) -> Dict[str, str]:
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _save_cache(cache_path: str, cache: Dict[str, str]):
+    # Write-then-rename so an interrupted run never leaves a truncated cache behind
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def _summarize_parts(chat, heading: str, parts: List[str], max_input_chars: int) -> str:
+    """Summarize parts in one call, or map-reduce them in groups when they don't fit"""
+    part_limit = max_input_chars // 2
+    parts = [part[:part_limit] for part in parts if part]
+
+    while True:
+        # Every group holds at least two parts, so each round at least halves the count
+        groups = [[]]
+        group_size = 0
+        for part in parts:
+            if len(groups[-1]) >= 2 and group_size + len(part) > max_input_chars:
+                groups.append([])
+                group_size = 0
+            groups[-1].append(part)
+            group_size += len(part)
+
+        summaries = []
+        for group in groups:
+            response = chat.invoke([
+                ("system", SUMMARY_PROMPT.format(heading=heading)),
+                ("human", "\n\n".join(group)),
+            ])
+            summaries.append(response.content.strip())
+
+        if len(summaries) == 1:
+            return summaries[0]
+        parts = [summary[:part_limit] for summary in summaries]
+
+
+def summarize_sections(
+    documents: List[Document],
+    chat,
+    cache_path: str = "./summary_cache.json",
+    max_input_chars: int = 12000,
+) -> List[Document]:
+    """Build summary nodes for the container elements produced by chunk_xml_bill.
+
+    Containers (titles, subtitles, oversized sections) are processed bottom-up
+    through their child_ids: leaf chunks contribute their text and child
+    containers contribute their summaries. Summaries are cached by a hash of
+    the section's content, the prompt, the model and max_input_chars, and the
+    cache is saved after every summary, so an interrupted run resumes where it
+    stopped and unchanged sections are never re-summarized.
+
+    Summary nodes get chunk ids after the last chunk of the bill; `summary_of`
+    holds the container's chunk id and `parent_id` the parent's summary node.
+    """
+    by_id = {doc.metadata["chunk_id"]: doc for doc in documents}
+    containers = [doc for doc in documents if doc.metadata.get("container")]
+    if not containers:
+        return []
+
+    next_id = max(by_id) + 1
+    summary_ids = {doc.metadata["chunk_id"]: next_id + i for i, doc in enumerate(containers)}
+    settings = f"{SUMMARY_PROMPT}\n{getattr(chat, 'model', '')}\n{max_input_chars}"
+
+    cache = _load_cache(cache_path)
+    hashes: Dict[int, str] = {}
+    summaries: Dict[int, str] = {}
+    summary_documents = []
+    cached = 0
+
+    # chunk_xml_bill appends a container before its descendants, so walking the
+    # documents in reverse always reaches children before their parents
+    for doc in reversed(containers):
+        chunk_id = doc.metadata["chunk_id"]
+        children = [by_id[child_id] for child_id in doc.metadata["child_ids"]]
+
+        hasher = hashlib.sha256(settings.encode("utf-8"))
+        hasher.update(doc.page_content.encode("utf-8"))
+        for child in children:
+            child_hash = hashes.get(child.metadata["chunk_id"]) or hashlib.sha256(
+                child.page_content.encode("utf-8")).hexdigest()
+            hasher.update(child_hash.encode("utf-8"))
+        content_hash = hashes[chunk_id] = hasher.hexdigest()
+
+        if content_hash in cache:
+            cached += 1
+        else:
+            parts = [
+                f"{child.page_content}\n{summaries[child.metadata['chunk_id']]}"
+                if child.metadata.get("container") else _plain_text(child.page_content)
+                for child in children
+            ]
+            logging.info(
+                f"Summarizing {doc.metadata['tag_name']} {doc.page_content!r} ({len(parts)} children)")
+            cache[content_hash] = _summarize_parts(
+                chat, doc.page_content, parts, max_input_chars)
+            _save_cache(cache_path, cache)
+
+        summaries[chunk_id] = cache[content_hash]
+        summary_documents.append(Document(
+            page_content=f"{doc.page_content}\n{summaries[chunk_id]}",
+            metadata={
+                "source": doc.metadata["source"],
+                "chunk_id": summary_ids[chunk_id],
+                "summary_of": chunk_id,
+                "tag_name": doc.metadata["tag_name"],
+                "parent_id": summary_ids.get(doc.metadata["parent_id"]),
+                "node_type": "summary",
+                "content_hash": content_hash,
+            }
+        ))
+
+    logging.info(
+        f"Section summaries: {len(containers) - cached} generated, {cached} from cache")
+    summary_documents.reverse()
+    return summary_documents
+
+
+if __name__ == "__main__":
+    import argparse
+    from langchain_ollama import ChatOllama, OllamaEmbeddings
+    from langchain_chroma import Chroma
+    from vector_index import MemmapVectorIndex
+    from xml_chunking import chunk_xml_bill
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(
+        description="Summarize a bill's titles and sections and add or update them in an existing vector store")
+    parser.add_argument("--bill", required=True,
+                        help="XML bill; must match the chunk source used when the store was built")
+    store = parser.add_mutually_exclusive_group(required=True)
+    store.add_argument("--index-dir", help="memmap vector index directory")
+    store.add_argument("--chroma-dir", help="Chroma persist directory")
+    parser.add_argument("--summary-cache", default="./summary_cache.json")
+    parser.add_argument("--max-input-chars", type=int, default=12000)
+    args = parser.parse_args()
+
+    ollama_emb = OllamaEmbeddings(model="mxbai-embed-large")
+    chat = ChatOllama(
+        base_url="http://localhost:11434/",
+        model="llama3.2",
+        temperature=0.8,
+        num_predict=2048,
+    )
+
+    documents = chunk_xml_bill(args.bill, ollama_emb, max_chunk_size=2048)
+    summaries = summarize_sections(documents, chat, cache_path=args.summary_cache,
+                                   max_input_chars=args.max_input_chars)
+
+    # Only this bill's summary nodes are replaced; leaf chunks keep their embeddings
+    stale = {"$and": [{"source": args.bill}, {"node_type": "summary"}]}
+    if args.index_dir:
+        MemmapVectorIndex(args.index_dir, ollama_emb).replace_documents(stale, summaries)
+    else:
+        db = Chroma(persist_directory=args.chroma_dir, embedding_function=ollama_emb)
+        db.delete(where=stale)
+        if summaries:
+            db.add_documents(summaries)
+
+    print(f"Indexed {len(summaries)} section summaries for {args.bill}")
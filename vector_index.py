@@ -0,0 +1,563 @@
+import os
+import json
+import shutil
+import time
+import argparse
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+try:
+    import hnswlib
+except ImportError:  # hnswlib is optional; brute force is used without it
+    hnswlib = None
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+HNSW_FILE = "hnsw.bin"
+
+# Metadata fields kept as columns so prefilters don't walk every metadata dict
+FILTER_FIELDS = ("source", "tag_name", "node_type")
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _document_line(page_content: str, metadata: Dict[str, Any]) -> str:
+    return json.dumps({"page_content": page_content, "metadata": metadata}, ensure_ascii=False) + "\n"
+
+
+class MemmapVectorIndex:
+    """In-process vector store over a memory-mapped, normalized float32 embedding matrix.
+
+    Exposes the subset of the Chroma interface used by the chat loop
+    (`similarity_search`, `similarity_search_with_score`, `get`) so it can be
+    swapped in for Chroma. Small corpora are searched exactly with batched
+    NumPy matrix products; large corpora use an HNSW graph when hnswlib is
+    installed.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        embedding_function,
+        block_size: int = 65536,
+        hnsw_ef: int = 64,
+        brute_force_threshold: int = 20000,
+    ):
+        self.index_dir = index_dir
+        self.embedding_function = embedding_function
+        self.block_size = block_size
+        self.brute_force_threshold = brute_force_threshold
+
+        self.embeddings = np.load(os.path.join(
+            index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self.chunk_ids = np.load(os.path.join(index_dir, CHUNK_IDS_FILE))
+
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        with open(os.path.join(index_dir, DOCUMENTS_FILE), 'r', encoding='utf-8') as file:
+            for line in file:
+                record = json.loads(line)
+                self.documents.append(record["page_content"])
+                self.metadatas.append(record["metadata"])
+
+        self._columns = {
+            field: np.array([metadata.get(field) for metadata in self.metadatas], dtype=object)
+            for field in FILTER_FIELDS
+        }
+
+        self.hnsw = None
+        hnsw_path = os.path.join(index_dir, HNSW_FILE)
+        if os.path.exists(hnsw_path):
+            if hnswlib is None:
+                logging.warning(
+                    f"{hnsw_path} exists but hnswlib is not installed, falling back to brute force search")
+            else:
+                self.hnsw = hnswlib.Index(
+                    space="ip", dim=self.embeddings.shape[1])
+                self.hnsw.load_index(
+                    hnsw_path, max_elements=len(self.chunk_ids))
+                self.hnsw.set_ef(hnsw_ef)
+
+        logging.info(
+            f"Loaded memmap index from {index_dir}: {len(self.chunk_ids)} vectors, "
+            f"dim {self.embeddings.shape[1]}, {'hnsw' if self.hnsw else 'brute force'}")
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        documents: List[Document],
+        embeddings,
+        embedding_function,
+        index_dir: str,
+        hnsw_threshold: int = 50000,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        **kwargs,
+    ) -> "MemmapVectorIndex":
+        """Write already computed embeddings (one row per document) to index_dir"""
+        if not documents:
+            raise ValueError("Cannot build a vector index from zero documents")
+        build_dir = cls._start_build(index_dir)
+
+        matrix = np.lib.format.open_memmap(
+            os.path.join(build_dir, EMBEDDINGS_FILE), mode="w+",
+            dtype=np.float32, shape=(len(documents), len(embeddings[0])))
+        for start in range(0, len(documents), 4096):
+            matrix[start:start + 4096] = _normalize(embeddings[start:start + 4096])
+        matrix.flush()
+        del matrix
+
+        cls._write_documents(documents, build_dir)
+        return cls._finish_build(build_dir, index_dir, embedding_function,
+                                 hnsw_threshold, hnsw_m, hnsw_ef_construction, **kwargs)
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        embedding_function,
+        index_dir: str,
+        batch_size: int = 256,
+        hnsw_threshold: int = 50000,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        **kwargs,
+    ) -> "MemmapVectorIndex":
+        """Embed documents in batches straight into the memory-mapped matrix"""
+        if not documents:
+            raise ValueError("Cannot build a vector index from zero documents")
+        build_dir = cls._start_build(index_dir)
+
+        matrix = None
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            vectors = _normalize(embedding_function.embed_documents(
+                [doc.page_content for doc in batch]))
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    os.path.join(build_dir, EMBEDDINGS_FILE), mode="w+",
+                    dtype=np.float32, shape=(len(documents), vectors.shape[1]))
+            matrix[start:start + len(batch)] = vectors
+            logging.info(
+                f"Embedded {start + len(batch)}/{len(documents)} chunks")
+        matrix.flush()
+        del matrix
+
+        cls._write_documents(documents, build_dir)
+        return cls._finish_build(build_dir, index_dir, embedding_function,
+                                 hnsw_threshold, hnsw_m, hnsw_ef_construction, **kwargs)
+
+    @classmethod
+    def from_chroma(
+        cls,
+        chroma_db,
+        index_dir: str,
+        page_size: int = 4096,
+        hnsw_threshold: int = 50000,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        **kwargs,
+    ) -> "MemmapVectorIndex":
+        """Export an existing Chroma collection page by page without re-embedding it"""
+        # langchain_chroma has no public count; the collection's is needed to size the matrix
+        total = chroma_db._collection.count()
+        if total == 0:
+            raise ValueError("Cannot build a vector index from zero documents")
+        build_dir = cls._start_build(index_dir)
+
+        matrix = None
+        chunk_ids = []
+        with open(os.path.join(build_dir, DOCUMENTS_FILE), 'w', encoding='utf-8') as file:
+            for offset in range(0, total, page_size):
+                page = chroma_db.get(limit=page_size, offset=offset,
+                                     include=["embeddings", "documents", "metadatas"])
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        os.path.join(build_dir, EMBEDDINGS_FILE), mode="w+",
+                        dtype=np.float32, shape=(total, len(page["embeddings"][0])))
+                matrix[offset:offset + len(page["documents"])] = _normalize(page["embeddings"])
+
+                for i, (content, metadata) in enumerate(zip(page["documents"], page["metadatas"])):
+                    metadata = metadata or {}
+                    chunk_ids.append(metadata.get("chunk_id", offset + i))
+                    file.write(_document_line(content, metadata))
+                logging.info(
+                    f"Exported {offset + len(page['documents'])}/{total} chunks from Chroma")
+        matrix.flush()
+        del matrix
+
+        np.save(os.path.join(build_dir, CHUNK_IDS_FILE),
+                np.array(chunk_ids, dtype=np.int64))
+        return cls._finish_build(build_dir, index_dir, chroma_db.embeddings,
+                                 hnsw_threshold, hnsw_m, hnsw_ef_construction, **kwargs)
+
+    def replace_documents(
+        self,
+        where: Optional[Dict[str, Any]],
+        documents: List[Document],
+        batch_size: int = 256,
+        hnsw_threshold: int = 50000,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        **kwargs,
+    ) -> "MemmapVectorIndex":
+        """Drop the rows matching `where` and append documents, embedding only the new ones.
+
+        The index is rewritten and swapped into place; use the returned index,
+        this one is closed.
+        """
+        mask = self._match_rows(where)
+        keep = np.arange(len(self)) if mask is None else np.flatnonzero(~mask)
+        if len(keep) + len(documents) == 0:
+            raise ValueError("Cannot build a vector index from zero documents")
+
+        new_vectors = np.empty((0, self.embeddings.shape[1]), dtype=np.float32)
+        if documents:
+            new_vectors = np.concatenate([
+                _normalize(self.embedding_function.embed_documents(
+                    [doc.page_content for doc in documents[start:start + batch_size]]))
+                for start in range(0, len(documents), batch_size)
+            ])
+
+        build_dir = self._start_build(self.index_dir)
+        matrix = np.lib.format.open_memmap(
+            os.path.join(build_dir, EMBEDDINGS_FILE), mode="w+",
+            dtype=np.float32, shape=(len(keep) + len(documents), self.embeddings.shape[1]))
+        for start in range(0, len(keep), self.block_size):
+            rows = keep[start:start + self.block_size]
+            matrix[start:start + len(rows)] = self.embeddings[rows]
+        matrix[len(keep):] = new_vectors
+        matrix.flush()
+        del matrix
+
+        self._write_documents(
+            [self._to_document(row) for row in keep] + list(documents), build_dir)
+        logging.info(
+            f"Replacing {len(self) - len(keep)} documents with {len(documents)} in {self.index_dir}")
+
+        # Release the old memory map before its directory is replaced
+        self.embeddings = None
+        self.hnsw = None
+        return self._finish_build(build_dir, self.index_dir, self.embedding_function,
+                                  hnsw_threshold, hnsw_m, hnsw_ef_construction, **kwargs)
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        """Whether index_dir holds a complete index, recovering from an interrupted swap"""
+        old_dir = os.path.normpath(index_dir) + ".old"
+        if not os.path.exists(index_dir) and os.path.exists(old_dir):
+            os.replace(old_dir, index_dir)
+        return os.path.exists(os.path.join(index_dir, DOCUMENTS_FILE))
+
+    @staticmethod
+    def _start_build(index_dir: str) -> str:
+        # Indexes are written to a sibling directory and only moved into place once
+        # complete, so a failed build never leaves a half-written index_dir behind
+        MemmapVectorIndex.exists(index_dir)
+        build_dir = os.path.normpath(index_dir) + ".building"
+        if os.path.exists(build_dir):
+            shutil.rmtree(build_dir)
+        os.makedirs(build_dir)
+        return build_dir
+
+    @classmethod
+    def _finish_build(cls, build_dir: str, index_dir: str, embedding_function, hnsw_threshold: int,
+                      hnsw_m: int, hnsw_ef_construction: int, **kwargs) -> "MemmapVectorIndex":
+        """Build the optional HNSW graph, then swap build_dir in for index_dir.
+
+        Callers must have closed their memory maps of both directories, since
+        open mapped files block directory renames on Windows.
+        """
+        matrix = np.load(os.path.join(build_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        if matrix.shape[0] >= hnsw_threshold:
+            cls._build_hnsw(matrix, build_dir, hnsw_m, hnsw_ef_construction)
+        del matrix
+
+        # The old index is moved aside rather than deleted first, so a crash at any
+        # point leaves either index_dir or index_dir.old for exists() to recover
+        old_dir = os.path.normpath(index_dir) + ".old"
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+        if os.path.exists(index_dir):
+            os.replace(index_dir, old_dir)
+        os.replace(build_dir, index_dir)
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+
+        return cls(index_dir, embedding_function, **kwargs)
+
+    @staticmethod
+    def _write_documents(documents: List[Document], index_dir: str):
+        chunk_ids = np.array(
+            [doc.metadata.get("chunk_id", i) for i, doc in enumerate(documents)], dtype=np.int64)
+        np.save(os.path.join(index_dir, CHUNK_IDS_FILE), chunk_ids)
+
+        with open(os.path.join(index_dir, DOCUMENTS_FILE), 'w', encoding='utf-8') as file:
+            for doc in documents:
+                file.write(_document_line(doc.page_content, doc.metadata))
+
+    @staticmethod
+    def _build_hnsw(matrix, index_dir: str, m: int, ef_construction: int):
+        if hnswlib is None:
+            logging.warning(
+                "hnswlib is not installed, skipping HNSW build; queries will use brute force search")
+            return
+        logging.info(f"Building HNSW graph over {matrix.shape[0]} vectors")
+        index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.init_index(max_elements=matrix.shape[0],
+                         M=m, ef_construction=ef_construction)
+        for start in range(0, matrix.shape[0], 65536):
+            block = np.asarray(matrix[start:start + 65536])
+            index.add_items(block, np.arange(start, start + len(block)))
+        index.save_index(os.path.join(index_dir, HNSW_FILE))
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def _match_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style `where` filter.
+
+        Supports field equality, `$eq`/`$ne`/`$in`/`$nin` operators and
+        `$and`/`$or`; a plain list value is shorthand for `$in`. Anything else
+        raises ValueError rather than silently matching nothing.
+        """
+        if not where:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in where.items():
+            if key in ("$and", "$or"):
+                clauses = [self._match_rows(clause) for clause in value if clause]
+                clauses = [clause for clause in clauses if clause is not None]
+                if clauses:
+                    combine = np.logical_and if key == "$and" else np.logical_or
+                    mask &= combine.reduce(clauses)
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported filter operator: {key}")
+            else:
+                mask &= self._match_field(key, value)
+        return mask
+
+    def _match_field(self, field: str, value: Any) -> np.ndarray:
+        negate = False
+        if isinstance(value, dict):
+            if len(value) != 1:
+                raise ValueError(f"Filter on {field!r} must have exactly one operator: {value}")
+            operator, operand = next(iter(value.items()))
+            if operator not in ("$eq", "$ne", "$in", "$nin"):
+                raise ValueError(f"Unsupported filter operator on {field!r}: {operator}")
+            negate = operator in ("$ne", "$nin")
+            values = list(operand) if operator in ("$in", "$nin") else [operand]
+        elif isinstance(value, (list, tuple, set)):
+            values = list(value)
+        else:
+            values = [value]
+
+        if field == "chunk_id":
+            mask = np.isin(self.chunk_ids, [int(v) for v in values])
+        elif field in self._columns:
+            column = self._columns[field]
+            mask = np.zeros(len(self), dtype=bool)
+            for v in values:
+                mask |= column == v
+        else:
+            mask = np.array([metadata.get(field) in values for metadata in self.metadatas],
+                            dtype=bool)
+        return ~mask if negate else mask
+
+    def _exact_search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        candidates = None if mask is None else np.flatnonzero(mask)
+        total = len(self) if candidates is None else len(candidates)
+
+        top_scores = np.empty((len(queries), 0), dtype=np.float32)
+        top_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, total, self.block_size):
+            if candidates is None:
+                rows = np.arange(start, min(start + self.block_size, total))
+                block = np.asarray(self.embeddings[start:start + self.block_size])
+            else:
+                rows = candidates[start:start + self.block_size]
+                block = self.embeddings[rows]
+
+            scores = np.concatenate([top_scores, queries @ block.T], axis=1)
+            rows = np.concatenate(
+                [top_rows, np.broadcast_to(rows, (len(queries), len(rows)))], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            top_scores, top_rows = scores, rows
+
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top_rows, order, axis=1)
+
+    def _hnsw_search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if mask is None:
+            rows, distances = self.hnsw.knn_query(queries, k=k)
+        else:
+            # hnswlib only supports filter callbacks single-threaded
+            rows, distances = self.hnsw.knn_query(
+                queries, k=k, num_threads=1, filter=lambda label: bool(mask[label]))
+        # "ip" space reports 1 - inner product
+        return 1.0 - distances, rows.astype(np.int64)
+
+    def search_by_vectors(
+        self,
+        query_vectors,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        exact: bool = False,
+    ) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine score) pairs for each query vector"""
+        queries = _normalize(query_vectors)
+        mask = self._match_rows(filter)
+        available = len(self) if mask is None else int(mask.sum())
+        k = min(k, available)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        use_hnsw = self.hnsw is not None and not exact and available > self.brute_force_threshold
+        scores = rows = None
+        if use_hnsw:
+            try:
+                scores, rows = self._hnsw_search(queries, k, mask)
+            except RuntimeError as e:
+                # Raised when a restrictive filter leaves the graph walk short of k hits
+                logging.info(
+                    f"HNSW search failed ({e}), falling back to exact search")
+        if scores is None:
+            scores, rows = self._exact_search(queries, k, mask)
+
+        return [
+            [(int(row), float(score))
+             for row, score in zip(query_rows, query_scores) if np.isfinite(score)]
+            for query_rows, query_scores in zip(rows, scores)
+        ]
+
+    def _to_document(self, row: int) -> Document:
+        return Document(page_content=self.documents[row], metadata=self.metadatas[row])
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_by_vectors([embedding], k=k, filter=filter)[0]
+        return [(self._to_document(row), score) for row, score in hits]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search_by_vectors(
+        self, embeddings, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        """Batched `similarity_search_by_vector`: one matrix search for all query embeddings"""
+        return [
+            [self._to_document(row) for row, _ in hits]
+            for hits in self.search_by_vectors(embeddings, k=k, filter=filter)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def get(self, where: Optional[Dict[str, Any]] = None) -> Dict[str, List[Any]]:
+        """Chroma-compatible `get`, returning ids, documents and metadatas"""
+        mask = self._match_rows(where)
+        rows = range(len(self)) if mask is None else np.flatnonzero(mask)
+        return {
+            "ids": [str(row) for row in rows],
+            "documents": [self.documents[row] for row in rows],
+            "metadatas": [self.metadatas[row] for row in rows],
+        }
+
+
+def benchmark(chroma_db, index: MemmapVectorIndex, queries: List[str], k: int = 10) -> Dict[str, Dict[str, float]]:
+    """Compare query latency and recall@k of Chroma and the memmap index against exact search"""
+    query_vectors = index.embedding_function.embed_documents(queries)
+    # Hits are compared by content, not row: Chroma has no memmap row numbers, bills
+    # repeat chunk text ("In general"), and identical texts tie on score anyway
+    exact = [Counter(index.documents[row] for row, _ in hits)
+             for hits in index.search_by_vectors(query_vectors, k=k, exact=True)]
+
+    def run(search) -> Dict[str, float]:
+        latencies = []
+        recalls = []
+        for vector, truth in zip(query_vectors, exact):
+            started = time.perf_counter()
+            found = Counter(search(vector))
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(sum((found & truth).values()) / max(sum(truth.values()), 1))
+        return {
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "recall_at_k": float(np.mean(recalls)),
+        }
+
+    results = {
+        "chroma": run(lambda vector: [
+            doc.page_content for doc in chroma_db.similarity_search_by_vector(vector, k=k)]),
+        "memmap_exact": run(lambda vector: [
+            index.documents[row] for row, _ in index.search_by_vectors([vector], k=k, exact=True)[0]]),
+    }
+    if index.hnsw is not None:
+        results["memmap_hnsw"] = run(lambda vector: [
+            index.documents[row] for row, _ in index.search_by_vectors([vector], k=k)[0]])
+    return results
+
+
+if __name__ == "__main__":
+    from langchain_ollama import OllamaEmbeddings
+    from langchain_chroma import Chroma
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(
+        description="Build the memmap vector index from Chroma and benchmark it")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser(
+        "build", help="export a Chroma DB into a memmap index")
+    build_parser.add_argument("--chroma-dir", default="./chroma_db")
+    build_parser.add_argument("--index-dir", default="./vector_index")
+    build_parser.add_argument("--hnsw-threshold", type=int, default=50000)
+
+    bench_parser = subparsers.add_parser(
+        "benchmark", help="compare latency and recall against Chroma")
+    bench_parser.add_argument("--chroma-dir", default="./chroma_db")
+    bench_parser.add_argument("--index-dir", default="./vector_index")
+    bench_parser.add_argument("--queries", required=True,
+                              help="text file with one query per line")
+    bench_parser.add_argument("-k", type=int, default=10)
+
+    args = parser.parse_args()
+
+    ollama_emb = OllamaEmbeddings(model="mxbai-embed-large")
+    db = Chroma(persist_directory=args.chroma_dir,
+                embedding_function=ollama_emb)
+
+    if args.command == "build":
+        MemmapVectorIndex.from_chroma(
+            db, args.index_dir, hnsw_threshold=args.hnsw_threshold)
+    else:
+        with open(args.queries, 'r', encoding='utf-8') as file:
+            queries = [line.strip() for line in file if line.strip()]
+        index = MemmapVectorIndex(args.index_dir, ollama_emb)
+        print(json.dumps(benchmark(db, index, queries, k=args.k), indent=2))
@@ -0,0 +1,106 @@
+from langchain_core.documents import Document
+from bs4 import BeautifulSoup
+import logging
+
+
+def element_heading(element):
+    # Bill XML headings are the element's own <enum> and <header>, e.g. "III Committee on ..."
+    heading_parts = [child.get_text(" ", strip=True)
+                     for child in element.find_all(["enum", "header"], recursive=False)]
+    heading = " ".join(part for part in heading_parts if part)
+    return heading or f"{element.name} {element.attrs.get('id', '')}".strip()
+
+
+def chunk_xml_bill(document_path, ollama_embeddings_model, max_chunk_size=2048):
+    documents = []
+
+    with open(document_path, 'r', encoding='utf-8') as file:
+        xml_content = file.read()
+
+    soup = BeautifulSoup(xml_content, 'lxml-xml')
+    root = soup.find()
+
+    def process_element(element, parent_id=None, skip_children=False):
+        element_id = len(documents)
+
+        # Extract attributes
+        attributes = dict(element.attrs)
+
+        # Log the tag name and ID
+        tag_name = element.name
+        # Get the id attribute, if it exists
+        tag_id = attributes.get('id', 'N/A')
+        logging.info(f"Processing tag: {tag_name}, ID: {tag_id}")
+
+        element_string = str(element)
+        element_length = len(element_string)
+
+        if element_length > max_chunk_size:
+            # If the element is too large, process its children
+            children = list(element.find_all(recursive=False))
+            if children:
+                # Keep the element in the tree as a heading-only container node so
+                # titles/sections can be summarized bottom-up from their children
+                doc = Document(
+                    page_content=element_heading(element),
+                    metadata={
+                        "source": document_path,
+                        "chunk_id": element_id,
+                        "tag_name": tag_name,
+                        "attributes": attributes,
+                        "parent_id": parent_id,
+                        "child_ids": [],
+                        "container": True,
+                    }
+                )
+                documents.append(doc)
+                doc.metadata["child_ids"] = [
+                    process_element(child, element_id, skip_children=False)
+                    for child in children
+                ]
+            else:
+                # If no children, create a document for the large element
+                doc = Document(
+                    page_content=element_string,
+                    metadata={
+                        "source": document_path,
+                        "chunk_id": element_id,
+                        "tag_name": tag_name,
+                        "attributes": attributes,
+                        "parent_id": parent_id,
+                        "child_ids": [],  # No children in this case
+                    }
+                )
+                documents.append(doc)
+        else:
+            # If the element is within the size limit, create a document
+            children = list(element.find_all(recursive=False))
+
+            doc = Document(
+                page_content=element_string,
+                metadata={
+                    "source": document_path,
+                    "chunk_id": element_id,
+                    "tag_name": tag_name,
+                    "attributes": attributes,
+                    "parent_id": parent_id,
+                    "child_ids": [],
+                }
+            )
+            documents.append(doc)
+
+            # Recursively process children
+            if not skip_children:
+                doc.metadata["child_ids"] = [
+                    process_element(child, element_id, skip_children=True)
+                    for child in children
+                ]
+
+        return element_id
+
+    if root:
+        process_element(root)
+    else:
+        print(f"Warning: No root element found in {document_path}")
+
+    return documents